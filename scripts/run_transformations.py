@@ -10,182 +10,411 @@ Learning Notes:
 """
 
 import os
+import re
 import json
+import mmap
+import logging
+import tempfile
+import functools
+import dataclasses
+from pathlib import Path
+import concurrent.futures
 from google.cloud import bigquery
 from google.oauth2 import service_account
 import yaml
-import time
+
+# Use the LibYAML C loader when PyYAML was built with it - parsing is
+# several times faster than the pure-Python SafeLoader, same behavior
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+# orjson is a C JSON parser, noticeably faster on the multi-KB service
+# account blob; fall back to the stdlib if it isn't installed
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# Repository layout, resolved once at import time instead of rebuilding
+# '../..' joins on every call
+_ROOT = Path(__file__).resolve().parent.parent
+_CONFIG_DIR = _ROOT / 'config'
+_SQL_DIR = _ROOT / 'sql'
+
+# One buffered stream handler instead of print(): fewer stdout syscalls
+# per statement on CI runners, and %-style arguments are only formatted
+# when the record is actually emitted
+log = logging.getLogger("bq_cicd")
+
+
+def _load_yaml_cached(path):
+    """
+    Parse a YAML file, keeping a JSON cache next to it for fast reloads.
+
+    YAML parsing is slow (pure-Python tokenizer), while json.load uses a
+    C parser. We cache the parsed result as <path>.cache.json and reuse it
+    as long as it is at least as new as the YAML file itself.
+    """
+    cache_path = f'{path}.cache.json'
+    yaml_mtime = os.stat(path).st_mtime
+
+    # Reuse the cache if it's up to date with the YAML file
+    try:
+        if os.stat(cache_path).st_mtime >= yaml_mtime:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass  # No cache yet, or it's unreadable - fall through and rebuild
+
+    with open(path, 'r') as f:
+        config = yaml.load(f, Loader=_SafeLoader)
+
+    # Write the cache atomically (tempfile + rename) so a crashed run
+    # can never leave a half-written cache behind
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path),
+            suffix='.cache.json.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f)
+        except (TypeError, ValueError):
+            # YAML can hold types JSON can't represent (e.g. unquoted
+            # dates). Skip caching rather than crash - and rather than
+            # cache a lossy copy that would hand later runs strings
+            # where a cold parse returns dates. A dump that succeeds
+            # round-trips faithfully.
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Cache is best-effort (e.g. read-only checkout)
+
+    return config
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PipelineConfig:
+    """
+    Validated pipeline configuration.
+
+    Constructing this up front means a missing or misspelled config key
+    fails immediately with a clear message, instead of surfacing as a
+    KeyError halfway through the run - after the client handshake and
+    the first statements have already executed.
+    """
+    gcp_project_id: str
+    dataset_id: str
+    table_id: str
+    location: str
+    data_file: str
+    schema_file: str
+    environment: str | None = None
+    staging_bucket: str | None = None
+    use_storage_write: bool = False
+
+    @classmethod
+    def from_yaml(cls, path):
+        """Load and validate a config YAML file."""
+        raw = _load_yaml_cached(path)
+
+        fields = dataclasses.fields(cls)
+        known = {f.name for f in fields}
+        required = {f.name for f in fields if f.default is dataclasses.MISSING}
+
+        missing = sorted(required - raw.keys())
+        if missing:
+            raise ValueError(
+                f"Missing required config keys in {path}: {', '.join(missing)}"
+            )
+
+        # Ignore keys we don't know (e.g. comments turned into options later)
+        return cls(**{k: v for k, v in raw.items() if k in known})
 
 
 def load_config():
-    """Load configuration from config.yaml file."""
+    """Load and validate configuration from config.yaml file."""
     # Check if CONFIG_FILE environment variable is set (for multi-environment support)
     config_file = os.environ.get('CONFIG_FILE', 'config.yaml')
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', config_file)
-    
-    print(f"📖 Loading config from: {config_file}")
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+    config_path = _CONFIG_DIR / config_file
 
+    log.info("📖 Loading config from: %s", config_file)
+    return PipelineConfig.from_yaml(config_path)
 
-def get_bigquery_client(config):
-    """Create and return BigQuery client."""
-    gcp_credentials = os.environ.get('GCP_SERVICE_ACCOUNT_KEY')
-    
+
+@functools.lru_cache(maxsize=4)
+def _build_bigquery_client(project_id, gcp_credentials):
+    """Build a BigQuery client for the given project and credentials."""
     if gcp_credentials:
-        print("🔐 Authenticating with service account from environment variable...")
-        credentials_info = json.loads(gcp_credentials)
+        log.info("🔐 Authenticating with service account from environment variable...")
+        credentials_info = _json.loads(gcp_credentials)
         credentials = service_account.Credentials.from_service_account_info(credentials_info)
-        client = bigquery.Client(
+        return bigquery.Client(
             credentials=credentials,
-            project=config['gcp_project_id']
+            project=project_id
         )
-    else:
-        print("🔐 Authenticating with local credentials...")
-        client = bigquery.Client(project=config['gcp_project_id'])
-    
-    return client
 
+    log.info("🔐 Authenticating with local credentials...")
+    return bigquery.Client(project=project_id)
 
-def read_sql_file(sql_file_path):
-    """Read SQL file and return contents."""
-    with open(sql_file_path, 'r') as f:
-        return f.read()
 
+def get_bigquery_client(config):
+    """
+    Create and return BigQuery client.
 
-def substitute_parameters(sql_content, config):
-    """Replace placeholders in SQL with actual values from config."""
-    replacements = {
-        '{project_id}': config['gcp_project_id'],
-        '{dataset_id}': config['dataset_id'],
-        '{table_id}': config['table_id']
-    }
-    
-    for placeholder, value in replacements.items():
-        sql_content = sql_content.replace(placeholder, value)
-    
-    return sql_content
+    The client is cached per (project, credentials), so repeated calls
+    reuse the same OAuth token and HTTP connection pool instead of
+    paying a fresh TLS handshake and token mint each time.
+    """
+    gcp_credentials = os.environ.get('GCP_SERVICE_ACCOUNT_KEY')
+
+    return _build_bigquery_client(config.gcp_project_id, gcp_credentials)
+
+
+# Placeholders supported in SQL files, mapped to their config keys.
+# A single compiled alternation (bytes mode, so it can run straight over
+# an mmap) replaces all of them in one pass instead of one scan per key.
+_PLACEHOLDER_RE = re.compile(rb'\{(project_id|dataset_id|table_id)\}')
+_PLACEHOLDER_KEYS = {
+    'project_id': 'gcp_project_id',
+    'dataset_id': 'dataset_id',
+    'table_id': 'table_id',
+}
+
+# Skips leading whitespace and comments to capture a statement's first
+# keyword; matches nothing for comment-only chunks
+_FIRST_KEYWORD_RE = re.compile(
+    r'(?:\s+|--[^\n]*|#[^\n]*|/\*.*?\*/)*([A-Za-z_]+)?',
+    re.DOTALL
+)
+
+
+def _split_statements(data):
+    """
+    Split SQL bytes into statements on top-level semicolons.
+
+    Tracks quoted strings ('...', \"...\", `...`, with backslash escapes)
+    and comments (--, #, /* */) so semicolons inside them never split a
+    statement - the contexts a naive split(';') gets wrong.
+    """
+    statements = []
+    start = 0
+    i = 0
+    n = len(data)
+
+    while i < n:
+        c = data[i]
+        if c in (0x27, 0x22, 0x60):  # ' " `
+            quote = c
+            i += 1
+            while i < n and data[i] != quote:
+                i += 2 if data[i] == 0x5C else 1  # Skip \-escaped chars
+            i += 1
+        elif c == 0x2D and data[i + 1:i + 2] == b'-':  # -- comment
+            newline = data.find(b'\n', i)
+            i = n if newline == -1 else newline + 1
+        elif c == 0x23:  # # comment
+            newline = data.find(b'\n', i)
+            i = n if newline == -1 else newline + 1
+        elif c == 0x2F and data[i + 1:i + 2] == b'*':  # /* comment */
+            end = data.find(b'*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif c == 0x3B:  # ; - top-level statement boundary
+            statements.append(data[start:i])
+            start = i + 1
+            i += 1
+        else:
+            i += 1
+
+    statements.append(data[start:])
+    return statements
+
+
+def read_statements(sql_path, config):
+    """
+    Read a SQL file and return its statements with parameters applied.
+
+    The file is mapped with mmap and the placeholder substitution runs
+    directly over the mapping in one pass, so only the substituted bytes
+    are ever materialized - not the extra read/substitute/split copies
+    the old string pipeline made. Returns (number, text, first keyword)
+    tuples; comment-only chunks are dropped.
+    """
+    if os.path.getsize(sql_path) == 0:
+        return []
+
+    with open(sql_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = _PLACEHOLDER_RE.sub(
+                lambda m: getattr(config, _PLACEHOLDER_KEYS[m.group(1).decode()]).encode(),
+                mm
+            )
+
+    statements = []
+    for i, raw in enumerate(_split_statements(data), 1):
+        text = raw.decode('utf-8').strip()
+        keyword = _FIRST_KEYWORD_RE.match(text).group(1)
+        if keyword:  # None means whitespace/comments only
+            statements.append((i, text, keyword.upper()))
+
+    return statements
 
 
 def execute_sql(client, sql_query, description="SQL query"):
     """Execute a SQL query and return results."""
-    print(f"\n🔄 Executing: {description}")
-    print(f"   Query preview: {sql_query[:100]}..." if len(sql_query) > 100 else f"   Query: {sql_query}")
+    log.info("\n🔄 Executing: %s", description)
+    if len(sql_query) > 100:
+        log.info("   Query preview: %.100s...", sql_query)
+    else:
+        log.info("   Query: %s", sql_query)
     
     try:
-        query_job = client.query(sql_query)
-        result = query_job.result()  # Wait for job to complete
-        
-        print(f"✅ Success! Processed {query_job.total_bytes_processed / 1024 / 1024:.2f} MB")
-        
-        if query_job.num_dml_affected_rows is not None:
-            print(f"   Affected rows: {query_job.num_dml_affected_rows}")
-        
-        return result
-        
+        # query_and_wait uses the synchronous query endpoint: one RPC
+        # for short queries instead of a job insert plus result polling
+        rows = client.query_and_wait(sql_query)
+
+        # RowIterator only grew total_bytes_processed in later releases
+        # than our pin, so don't assume it's there
+        total_bytes = getattr(rows, 'total_bytes_processed', None)
+        if total_bytes is not None:
+            log.info("✅ Success! Processed %.2f MB", total_bytes / 1024 / 1024)
+        else:
+            log.info("✅ Success!")
+
+        if rows.num_dml_affected_rows is not None:
+            log.info("   Affected rows: %s", rows.num_dml_affected_rows)
+
+        return rows
+
     except Exception as e:
-        print(f"❌ Error executing query: {str(e)}")
+        log.info("❌ Error executing query: %s", e)
         raise
 
 
+def _execute_statements_concurrently(client, numbered_statements, total, description):
+    """
+    Execute a batch of independent SQL statements in parallel.
+
+    BigQuery runs each job server-side, so the Python loop is only
+    waiting on job.result() - submitting the jobs from a thread pool
+    overlaps those waits instead of paying one round-trip per statement.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        futures = {
+            pool.submit(
+                execute_sql,
+                client,
+                statement,
+                f"{description} - Statement {i}/{total}"
+            ): i
+            for i, statement in numbered_statements
+        }
+
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                log.info("⚠️  Statement %d had an error, but continuing...", i)
+                log.info("   Error: %s", e)
+                # Continue with remaining statements
+
+
 def run_sql_file(client, config, sql_filename, description):
     """Read and execute an entire SQL file."""
-    print("\n" + "=" * 60)
-    print(f"📄 Processing: {sql_filename}")
-    print("=" * 60)
+    log.info("\n%s", "=" * 60)
+    log.info("📄 Processing: %s", sql_filename)
+    log.info("=" * 60)
     
     # Read SQL file
-    sql_path = os.path.join(os.path.dirname(__file__), '..', 'sql', sql_filename)
-    
+    sql_path = _SQL_DIR / sql_filename
+
     if not os.path.exists(sql_path):
-        print(f"⚠️  File not found: {sql_path}")
+        log.info("⚠️  File not found: %s", sql_path)
         return
-    
-    sql_content = read_sql_file(sql_path)
-    
-    # Substitute parameters
-    sql_content = substitute_parameters(sql_content, config)
-    
-    # Split by semicolon to handle multiple statements
-    # Filter out empty statements
-    statements = [s.strip() for s in sql_content.split(';') if s.strip()]
-    
-    print(f"📝 Found {len(statements)} SQL statement(s) to execute")
-    
-    # Execute each statement
-    for i, statement in enumerate(statements, 1):
-        # Skip comments-only statements
-        if statement.startswith('--') or not statement:
-            continue
-        
-        try:
-            execute_sql(
-                client, 
-                statement, 
-                description=f"{description} - Statement {i}/{len(statements)}"
+
+    # Substitute parameters and split into statements in one pass
+    numbered = read_statements(sql_path, config)
+
+    log.info("📝 Found %d SQL statement(s) to execute", len(numbered))
+
+    # Split into two phases: DDL (CREATE ...) first, then everything else.
+    # Statements within a phase are independent of each other, so each
+    # phase can run concurrently; running DDL first guarantees tables and
+    # views exist before any DML that might reference them.
+    ddl = [(i, s) for i, s, keyword in numbered if keyword == 'CREATE']
+    dml = [(i, s) for i, s, keyword in numbered if keyword != 'CREATE']
+
+    for phase in (ddl, dml):
+        if phase:
+            _execute_statements_concurrently(
+                client, phase, len(numbered), description
             )
-            time.sleep(1)  # Small delay between queries for table creation to propagate
-        except Exception as e:
-            print(f"⚠️  Statement {i} had an error, but continuing...")
-            print(f"   Error: {e}")
-            # Continue with next statement
 
 
 def verify_transformations(client, config):
     """Run verification queries to check transformation results."""
-    print("\n" + "=" * 60)
-    print("🔍 Verifying Transformations")
-    print("=" * 60)
+    log.info("\n%s", "=" * 60)
+    log.info("🔍 Verifying Transformations")
+    log.info("=" * 60)
     
     # Check if department_summary table exists
-    table_id = f"{config['gcp_project_id']}.{config['dataset_id']}.department_summary"
+    table_id = f"{config.gcp_project_id}.{config.dataset_id}.department_summary"
     
     try:
         table = client.get_table(table_id)
-        print(f"✅ Table exists: department_summary")
-        print(f"   Rows: {table.num_rows}")
+        log.info("✅ Table exists: department_summary")
+        log.info("   Rows: %s", table.num_rows)
     except Exception as e:
-        print(f"⚠️  Table not found: department_summary")
-        print(f"   This is normal if transformations just created it.")
-        print(f"   Skipping verification.")
+        log.info("⚠️  Table not found: department_summary")
+        log.info("   This is normal if transformations just created it.")
+        log.info("   Skipping verification.")
         return
     
-    # Check department summary
+    # Check department summary - capped at 20 rows, verification only
+    # needs a glance at the top departments, not the full table
     verify_query = f"""
-    SELECT 
+    SELECT
         department,
         employee_count,
         avg_salary,
         total_salary
-    FROM 
-        `{config['gcp_project_id']}.{config['dataset_id']}.department_summary`
-    ORDER BY 
+    FROM
+        `{config.gcp_project_id}.{config.dataset_id}.department_summary`
+    ORDER BY
         total_salary DESC
+    LIMIT 20
     """
-    
+
     try:
-        print("\n📊 Department Summary Results:")
+        log.info("\n📊 Department Summary Results:")
         results = execute_sql(client, verify_query, "Verification query")
-        
-        for row in results:
-            print(f"   {row.department}: {row.employee_count} employees, "
-                  f"Avg: ${row.avg_salary:,.2f}, Total: ${row.total_salary:,}")
+
+        # Render the whole result in one pass via pandas instead of
+        # formatting row by row in Python
+        df = results.to_dataframe(create_bqstorage_client=False)
+        log.info("%s", df.to_string(index=False))
     except Exception as e:
-        print(f"⚠️  Could not verify transformations: {e}")
-        print(f"   This may be normal - check BigQuery Console to verify data.")
+        log.info("⚠️  Could not verify transformations: %s", e)
+        log.info("   This may be normal - check BigQuery Console to verify data.")
 
 
 def main():
     """Main execution function."""
-    print("=" * 60)
-    print("🚀 Starting BigQuery Transformations")
-    print("=" * 60)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    log.info("=" * 60)
+    log.info("🚀 Starting BigQuery Transformations")
+    log.info("=" * 60)
     
     # Load configuration
-    print("\n📖 Loading configuration...")
+    log.info("\n📖 Loading configuration...")
     config = load_config()
-    print(f"   Project: {config['gcp_project_id']}")
-    print(f"   Dataset: {config['dataset_id']}")
+    log.info("   Project: %s", config.gcp_project_id)
+    log.info("   Dataset: %s", config.dataset_id)
     
     # Create BigQuery client
     client = get_bigquery_client(config)
@@ -198,16 +427,12 @@ def main():
         'Data transformations'
     )
     
-    # Wait a moment for BigQuery to process table creation
-    print("\n⏳ Waiting for BigQuery to process table creation...")
-    time.sleep(3)
-    
     # Verify results
     verify_transformations(client, config)
     
-    print("\n" + "=" * 60)
-    print("✅ All transformations completed successfully!")
-    print("=" * 60)
+    log.info("\n%s", "=" * 60)
+    log.info("✅ All transformations completed successfully!")
+    log.info("=" * 60)
     
     return 0
 
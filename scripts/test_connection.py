@@ -0,0 +1,57 @@
+"""
+Test BigQuery connectivity and configuration.
+Run this to diagnose pipeline failures before digging through CI logs.
+
+Learning Notes:
+- Reuses the config loading and client construction from load_data.py
+- Verifies authentication and basic API access
+- Lists at most 25 datasets so the check stays fast in any project
+"""
+
+from load_data import load_config, get_bigquery_client
+
+# How many datasets to list at most. A plain list_datasets() would
+# enumerate every dataset in the project - a paginated cascade of RPCs
+# in large projects - just to print a handful of names.
+MAX_DATASETS = 25
+
+
+def test_environment():
+    """Check config, authentication, and BigQuery API access."""
+    print("\n📖 Loading configuration...")
+    config = load_config()
+    print(f"   Project: {config.gcp_project_id}")
+    print(f"   Dataset: {config.dataset_id}")
+    print(f"   Location: {config.location}")
+
+    client = get_bigquery_client(config)
+
+    print("\n🔍 Checking BigQuery API access...")
+    datasets = list(client.list_datasets(max_results=MAX_DATASETS))
+
+    if datasets:
+        print(f"✅ Connection OK - showing up to {MAX_DATASETS} dataset(s):")
+        for dataset in datasets:
+            print(f"   - {dataset.dataset_id}")
+    else:
+        print("✅ Connection OK - project has no datasets yet")
+
+    return 0
+
+
+def main():
+    """Main execution function."""
+    print("=" * 60)
+    print("🚀 Testing BigQuery Connection")
+    print("=" * 60)
+
+    try:
+        return test_environment()
+    except Exception as e:
+        print(f"❌ Connection test failed: {e}")
+        print("   Check your credentials and config file values.")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())